@@ -4,6 +4,7 @@
 #     "mcp>=1.0.0",
 #     "Pyro5>=5.14",
 #     "numpy>=1.24.0",
+#     "numba>=0.59",
 # ]
 # ///
 
@@ -18,14 +19,88 @@ mcp = FastMCP("AFM_Digital_Twin")
 # CONFIGURATION - Set your default path here so it can auto-initialize
 DEFAULT_H5_PATH = "dset_spm1.h5" 
 
+# marshal sends bytes payloads untouched and is much cheaper than serpent for
+# long lists of floats, so scans travel as raw buffers whenever the server allows it
+PYRO_SERIALIZER = "marshal"
+
+def _to_array(array_data, shape, dtype):
+    """
+    Rebuild an ndarray from the (data, shape, dtype) triple sent by the server.
+    Raw buffers are wrapped with np.frombuffer (no per-element Python objects);
+    plain lists are still accepted for servers that send array.tolist().
+    """
+    if isinstance(array_data, (bytes, bytearray, memoryview)):
+        return np.frombuffer(array_data, dtype=np.dtype(dtype)).reshape(shape)
+    return np.asarray(array_data, dtype=dtype).reshape(shape)
+
+_channel_stats = None  # Numba kernel, built on first use so numba stays out of server start-up
+
+def _get_channel_stats():
+    """Compile (or load from the on-disk cache) the per-channel statistics kernel"""
+    global _channel_stats
+    if _channel_stats is None:
+        from numba import njit
+        
+        @njit(cache=True)
+        def channel_stats(data):
+            """
+            Mean and std of every row of an (n_channels, n_points) array.
+            Each channel is read once; a scan has only a few channels, too few to pay for threads.
+            Welford's update in float64; a NaN propagates to both stats, as in np.mean/np.std.
+            """
+            n_channels, n_points = data.shape
+            stats = np.empty((n_channels, 2))
+            if n_points == 0:
+                stats[:] = np.nan
+                return stats
+            for c in range(n_channels):
+                mean = 0.0
+                m2 = 0.0
+                count = 0
+                for v in data[c]:
+                    x = np.float64(v)
+                    count += 1
+                    delta = x - mean
+                    mean += delta / count
+                    m2 += delta * (x - mean)
+                stats[c, 0] = mean
+                stats[c, 1] = np.sqrt(m2 / n_points)
+            return stats
+        
+        _channel_stats = channel_stats
+    return _channel_stats
+
+def _format_channel_stats(header, channels, data):
+    """Build the per-channel report as a list of parts joined once at the end"""
+    if len(channels) == 0 or data.size == 0:
+        return header
+    stats = _get_channel_stats()(data.reshape(len(channels), -1))
+    parts = [header]
+    for ch, (mean, std) in zip(channels, stats):
+        parts.append(f"- {ch}: [Mean: {mean:.3e}, Std: {std:.3e}]\n")
+    return "".join(parts)
+
+# Global variable to store the microscope connection
+_mic_server = None
+
+def _get_proxy(uri="PYRO:microscope.server@localhost:9092"):
+    """Get or create the microscope server connection, bound once and reused by every tool"""
+    global _mic_server
+    if _mic_server is None:
+        _mic_server = Pyro5.api.Proxy(uri)
+        _mic_server._pyroSerializer = PYRO_SERIALIZER
+        _mic_server._pyroBind()
+    # Sync tools may run on a worker thread, and a proxy belongs to one thread at a time
+    _mic_server._pyroClaimOwnership()
+    return _mic_server
+
 def get_initialized_mic(data_path=DEFAULT_H5_PATH, data_source="Compound_Dataset_1"):
     """
     Connects to the existing server and initializes it immediately.
     This bypasses the 'forgotten object' bug by ensuring the object 
     is created right before we use it.
     """
-    uri = "PYRO:microscope.server@localhost:9092"
-    mic = Pyro5.api.Proxy(uri)
+    mic = _get_proxy()
     
     # Force initialization every time a tool is called 
     # to ensure the 'microscope' attribute exists in the current session.
@@ -52,12 +127,9 @@ def get_full_scan(channels: list[str], direction: str = "horizontal", trace: str
         trace=trace
     )
     
-    dat = np.array(array_list, dtype=dtype).reshape(shape)
+    dat = _to_array(array_list, shape, dtype)
     
-    result = f"✅ 2D Scan Completed (Shape: {shape})\n"
-    for i, ch in enumerate(channels):
-        result += f"- {ch}: [Mean: {np.mean(dat[i]):.3e}, Std: {np.std(dat[i]):.3e}]\n"
-    return result
+    return _format_channel_stats(f"✅ 2D Scan Completed (Shape: {shape})\n", channels, dat)
 
 @mcp.tool()
 def scan_individual_line(direction: str, coord: float, channels: list[str]):
@@ -14,7 +14,8 @@
 from mcp.server.fastmcp import FastMCP
 from typing import Optional
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import os
 import sys
 from datetime import datetime
@@ -113,7 +114,10 @@ def segment_image(image_path: str) -> str:
         filepath = os.path.join(OUTPUT_DIR, f"segmentation_{timestamp}.png")
         
         # Create side-by-side visualization
-        fig, axes = plt.subplots(1, 2, figsize=(12, 6))
+        # Agg-backed Figure directly, without pyplot's global state
+        fig = Figure(figsize=(12, 6))
+        FigureCanvasAgg(fig)
+        axes = fig.subplots(1, 2)
         
         # Original image
         axes[0].imshow(image_array, cmap='gray')
@@ -125,9 +129,8 @@ def segment_image(image_path: str) -> str:
         axes[1].set_title('Segmentation Prediction')
         axes[1].axis('off')
         
-        plt.tight_layout()
-        plt.savefig(filepath, dpi=150, bbox_inches='tight')
-        plt.close()
+        fig.tight_layout()
+        fig.savefig(filepath, dpi=150, bbox_inches='tight')
         
         abs_filepath = os.path.abspath(filepath)
         
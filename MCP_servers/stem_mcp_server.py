@@ -6,9 +6,11 @@
 #     "python-dotenv>=1.1.1",
 #     "Pyro5>=5.14",
 #     "numpy>=1.24.0",
+#     "numba>=0.59",
 #     "scikit-learn>=1.3.0",
 #     "matplotlib>=3.7.2",
-#     "requests>=2.32.0",
+#     "httpx[http2]>=0.27",
+#     "orjson>=3.9",
 # ]
 # ///
 
@@ -16,28 +18,62 @@ from mcp.server.fastmcp import FastMCP
 from typing import List, Tuple, Optional
 import numpy as np
 import Pyro5.api
-from sklearn.decomposition import PCA
-from sklearn.cluster import KMeans
-import json
+import orjson
 import os
-import requests
+import httpx
 import sys
-import matplotlib.pyplot as plt
+import tempfile
+
+# Optional: USE_SKLEARNEX=1 routes PCA/KMeans to Intel's oneDAL kernels (scikit-learn-intelex).
+# The patch has to be applied before the estimators are imported.
+# Otherwise scikit-learn is only imported by the analysis tools, keeping it out of server start-up.
+if os.environ.get("USE_SKLEARNEX") == "1":
+    try:
+        from sklearnex import patch_sklearn
+        patch_sklearn()
+    except ImportError:
+        print("USE_SKLEARNEX=1 but scikit-learn-intelex is not installed, using stock scikit-learn", file=sys.stderr)
+
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from datetime import datetime
 
 mcp = FastMCP("STEMMicroscope")
 
 # Global variable to store the microscope connection
 _mic_server = None
+# marshal is built into Python on both ends and skips serpent's text/base64 encoding
+PYRO_SERIALIZER = "marshal"
 _current_data = {
     "spectra": [],
     "locations": [],
     "overview_image": None,
     "pca_results": None,
+    "pca_model": None,  # Fitted PCA, reused while the spectra are unchanged
     "clusters": None,
-    "saved_images": []  # Track all saved images
+    "saved_images": [],  # Track all saved images
+    "meta": None  # Scalar description of the collected spectra, for status queries
 }
 
+# Shared HTTP client: connections and TLS sessions are reused across downloads
+_http = httpx.Client(http2=True, timeout=60.0, follow_redirects=True)
+
+# Overview figure kept between calls so repeated captures only swap the pixel data
+_overview_plot = {"fig": None, "image": None}
+# Same for point spectra: the axes are identical, only the line data changes
+_spectrum_plot = {"fig": None, "ax": None, "line": None, "x": None}
+
+# Above this many points clustering of full spectra switches to MiniBatchKMeans
+MINIBATCH_KMEANS_THRESHOLD = 5000
+# Data with at most this many features (e.g. PCA scores) and at least this many points
+# is clustered by the Numba Lloyd loop; smaller inputs are not worth its compile time
+LOWDIM_KMEANS_MAX_DIM = 4
+LOWDIM_KMEANS_MIN_POINTS = 20000
+
+# Grid spectra larger than this are kept in a memory-mapped temporary file instead of the heap
+SPECTRA_MEMMAP_BYTES = 512 * 1024 ** 2
+
 # Create output directory for images
 OUTPUT_DIR = "stem_analysis_images"
 if not os.path.exists(OUTPUT_DIR):
@@ -51,11 +87,164 @@ def _save_image_info(filepath: str, description: str):
         "timestamp": datetime.now().isoformat()
     })
 
+def _to_array(array_data, shape, dtype):
+    """
+    Turn an (array_data, shape, dtype) reply from the server into an ndarray.
+    Byte payloads become a zero-copy np.frombuffer view; lists (array.tolist())
+    are converted with a single np.asarray.
+    """
+    if isinstance(array_data, (bytes, bytearray, memoryview)):
+        return np.frombuffer(array_data, dtype=np.dtype(dtype)).reshape(shape)
+    return np.asarray(array_data, dtype=dtype).reshape(shape)
+
+def _allocate_spectra(n_points: int, spectrum_len: int, dtype):
+    """
+    Allocate the (points x spectrum) matrix, memory-mapped when it is large.
+    The backing file is anonymous (already unlinked on POSIX, delete-on-close on Windows), so the OS
+    removes it once the mapping is released, including on a crash or a failed collection.
+    """
+    dtype = np.dtype(dtype)
+    if n_points * spectrum_len * dtype.itemsize > SPECTRA_MEMMAP_BYTES:
+        # The mapping holds its own handle, so the file object can be closed right away
+        with tempfile.TemporaryFile() as f:
+            return np.memmap(f, mode="w+", dtype=dtype, shape=(n_points, spectrum_len))
+    return np.empty((n_points, spectrum_len), dtype=dtype)
+
+def _release_spectra():
+    """Drop the collected spectra and everything derived from them"""
+    _current_data["spectra"] = []
+    _current_data["locations"] = []
+    _current_data["pca_results"] = None
+    _current_data["pca_model"] = None
+    _current_data["clusters"] = None
+    _current_data["meta"] = None
+
+_assign_labels = None  # Numba kernel, built on first use so numba stays out of server start-up
+
+def _get_assign_labels():
+    """Compile (or load from the on-disk cache) the Lloyd assignment kernel"""
+    global _assign_labels
+    if _assign_labels is None:
+        from numba import njit, prange
+        
+        @njit(parallel=True, fastmath=True, cache=True)
+        def assign_labels(X, centers, labels):
+            """
+            Lloyd assignment step: label every point with its nearest center.
+            Returns how many labels changed, so the caller can stop once it is zero.
+            """
+            n_points, n_dims = X.shape
+            n_clusters = centers.shape[0]
+            changed = 0
+            for i in prange(n_points):
+                best = 0
+                best_dist = 0.0
+                for c in range(n_clusters):
+                    dist = 0.0
+                    for j in range(n_dims):
+                        diff = X[i, j] - centers[c, j]
+                        dist += diff * diff
+                    if c == 0 or dist < best_dist:
+                        best = c
+                        best_dist = dist
+                if labels[i] != best:
+                    labels[i] = best
+                    changed += 1
+            return changed
+        
+        _assign_labels = assign_labels
+    return _assign_labels
+
+def _lowdim_kmeans(data, n_clusters: int, random_state: int, max_iter: int = 300, tol: float = 1e-4):
+    """
+    K-means for low-dimensional data: k-means++ seeding, then Lloyd iterations with the Numba assignment step.
+    Follows sklearn's KMeans: empty clusters are moved to the points farthest from their centers, and
+    iteration stops once the squared center shift falls below tol times the mean feature variance.
+    """
+    from sklearn.cluster import kmeans_plusplus
+    
+    assign_labels = _get_assign_labels()
+    X = np.ascontiguousarray(data, dtype=np.float64)
+    centers, _ = kmeans_plusplus(X, n_clusters, random_state=random_state)
+    labels = np.full(X.shape[0], -1, dtype=np.int64)
+    tol = tol * np.mean(np.var(X, axis=0))
+    for _ in range(max_iter):
+        if assign_labels(X, centers, labels) == 0:
+            break
+        old_centers = centers.copy()
+        counts = np.bincount(labels, minlength=n_clusters)
+        sums = np.stack([np.bincount(labels, weights=X[:, j], minlength=n_clusters) for j in range(X.shape[1])], axis=1)
+        filled = counts > 0
+        centers[filled] = sums[filled] / counts[filled, None]
+        empty = np.flatnonzero(~filled)
+        if empty.size:
+            dist = ((X - old_centers[labels]) ** 2).sum(axis=1)
+            centers[empty] = X[np.argpartition(dist, -empty.size)[-empty.size:]]
+        if ((centers - old_centers) ** 2).sum() <= tol:
+            # Converged on the centers; one last assignment keeps the labels consistent with them
+            assign_labels(X, centers, labels)
+            break
+    return labels
+
+def _plot_overview_image(im_array, filepath: str):
+    """Save the overview image, reusing the cached figure when the image shape is unchanged"""
+    vmin, vmax = im_array.min(), im_array.max()
+    image = _overview_plot["image"]
+    if image is None or image.get_array().shape != im_array.shape:
+        # Plain Agg-backed Figure: long-lived, so kept out of pyplot's global figure manager
+        fig = Figure(figsize=(10, 8))
+        FigureCanvasAgg(fig)
+        ax = fig.subplots()
+        # Explicit limits and nearest sampling skip the autoscale pass and antialiasing resample
+        image = ax.imshow(im_array, cmap='gray', interpolation='nearest', vmin=vmin, vmax=vmax)
+        fig.colorbar(image, ax=ax, label='Intensity')
+        ax.set_title('Overview Image')
+        ax.set_xlabel('X')
+        ax.set_ylabel('Y')
+        fig.tight_layout()
+        _overview_plot["fig"] = fig
+        _overview_plot["image"] = image
+    else:
+        image.set_data(im_array)
+        image.set_clim(vmin, vmax)
+    _overview_plot["fig"].savefig(filepath, dpi=150, bbox_inches='tight')
+
+def _plot_spectrum(spectrum, title: str, filepath: str):
+    """Save a spectrum plot, reusing the cached figure and only updating the line data"""
+    if _spectrum_plot["line"] is None:
+        fig = Figure(figsize=(10, 6))
+        FigureCanvasAgg(fig)
+        ax = fig.subplots()
+        line, = ax.plot(spectrum)
+        ax.set_xlabel('Energy Channel')
+        ax.set_ylabel('Intensity')
+        ax.grid(True, alpha=0.3)
+        _spectrum_plot["fig"] = fig
+        _spectrum_plot["ax"] = ax
+        _spectrum_plot["line"] = line
+    else:
+        ax = _spectrum_plot["ax"]
+        # Spectra from one dataset share a length, so the channel axis is built once
+        x = _spectrum_plot["x"]
+        if x is None or len(x) != len(spectrum):
+            x = np.arange(len(spectrum))
+            _spectrum_plot["x"] = x
+        _spectrum_plot["line"].set_data(x, spectrum)
+        ax.relim()
+        ax.autoscale_view()
+    _spectrum_plot["ax"].set_title(title)
+    _spectrum_plot["fig"].savefig(filepath, dpi=150, bbox_inches='tight')
+
 def _get_microscope_connection(uri: str = "PYRO:microscope.server@localhost:9091"):
-    """Get or create microscope server connection"""
+    """Get or create microscope server connection (bound up front, so tool calls never pay for the connect)"""
     global _mic_server
     if _mic_server is None:
-        _mic_server = Pyro5.api.Proxy(uri)
+        proxy = Pyro5.api.Proxy(uri)
+        proxy._pyroSerializer = PYRO_SERIALIZER
+        proxy._pyroBind()
+        _mic_server = proxy
+    # Sync tools may run on a worker thread, and a proxy belongs to one thread at a time
+    _mic_server._pyroClaimOwnership()
     return _mic_server
 
 @mcp.tool(
@@ -82,20 +271,13 @@ def download_data_file(url: str, filename: Optional[str] = None) -> str:
         print(f"Downloading from: {url}", file=sys.stderr)
         print(f"Saving to: {abs_path}", file=sys.stderr)
         
-        response = requests.get(url, verify=False, stream=True)
-        response.raise_for_status()
-        
-        # Save the file
-        total_size = int(response.headers.get('content-length', 0))
-        with open(abs_path, 'wb') as f:
-            if total_size == 0:
-                f.write(response.content)
-            else:
-                downloaded = 0
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
+        with _http.stream("GET", url) as response:
+            response.raise_for_status()
+            
+            # Save the file: stream it to disk in 1 MiB blocks
+            with open(abs_path, 'wb') as f:
+                for chunk in response.iter_bytes(chunk_size=1024 * 1024):
+                    f.write(chunk)
         
         # Verify file exists
         if os.path.exists(abs_path):
@@ -104,7 +286,7 @@ def download_data_file(url: str, filename: Optional[str] = None) -> str:
         else:
             return f"Error: File download failed - file not found at {abs_path}"
             
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return f"Error downloading file: {str(e)}\n  URL: {url}"
     except Exception as e:
         return f"Error: {str(e)}"
@@ -187,22 +369,14 @@ def get_overview_image() -> str:
         array_list, shape, dtype = mic_server.get_overview_image()
         
         # Store the image in global data
-        im_array = np.array(array_list, dtype=dtype).reshape(shape)
+        im_array = _to_array(array_list, shape, dtype)
         _current_data["overview_image"] = im_array
         
         # Save the image
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filepath = os.path.join(OUTPUT_DIR, f"overview_image_{timestamp}.png")
         
-        plt.figure(figsize=(10, 8))
-        plt.imshow(im_array, cmap='gray')
-        plt.colorbar(label='Intensity')
-        plt.title('Overview Image')
-        plt.xlabel('X')
-        plt.ylabel('Y')
-        plt.tight_layout()
-        plt.savefig(filepath, dpi=150, bbox_inches='tight')
-        plt.close()
+        _plot_overview_image(im_array, filepath)
         
         _save_image_info(filepath, "Overview image from microscope")
         
@@ -227,26 +401,18 @@ def get_point_spectrum(x: int, y: int, channel: str = "Channel_001") -> str:
     try:
         mic_server = _get_microscope_connection()
         array_list, shape, dtype = mic_server.get_point_data(channel, x, y)
-        spectrum = np.array(array_list, dtype=dtype).reshape(shape)
+        spectrum = _to_array(array_list, shape, dtype)
         
         # Save spectrum plot
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filepath = os.path.join(OUTPUT_DIR, f"spectrum_point_{x}_{y}_{timestamp}.png")
         
-        plt.figure(figsize=(10, 6))
-        plt.plot(spectrum.flatten())
-        plt.title(f'Spectrum at Point ({x}, {y})')
-        plt.xlabel('Energy Channel')
-        plt.ylabel('Intensity')
-        plt.grid(True, alpha=0.3)
-        plt.tight_layout()
-        plt.savefig(filepath, dpi=150, bbox_inches='tight')
-        plt.close()
+        _plot_spectrum(spectrum.ravel(), f'Spectrum at Point ({x}, {y})', filepath)
         
         _save_image_info(filepath, f"Spectrum from point ({x}, {y})")
         
         abs_path = os.path.abspath(filepath)
-        return f"Spectrum retrieved from point ({x}, {y}).\nShape: {shape}\nDtype: {dtype}\nSpectrum length: {len(spectrum.flatten())}\n\n📸 Spectrum plot saved to: {abs_path}"
+        return f"Spectrum retrieved from point ({x}, {y}).\nShape: {shape}\nDtype: {dtype}\nSpectrum length: {spectrum.size}\n\n📸 Spectrum plot saved to: {abs_path}"
     except Exception as e:
         return f"Error getting spectrum: {str(e)}"
 
@@ -270,26 +436,41 @@ def collect_grid_spectra(
     try:
         mic_server = _get_microscope_connection()
         
-        spectra = []
-        locations = []
+        # A new collection replaces the previous spectra and invalidates any analysis of them
+        _release_spectra()
+        
+        # Rows are filled in place once the first reply gives the spectrum length
+        spectra = None
         
         for x in range(grid_size_x):
             for y in range(grid_size_y):
                 array_list, shape, dtype = mic_server.get_point_data(channel, x, y)
-                spectrum = np.array(array_list, dtype=dtype).reshape(shape)
-                spectra.append(spectrum.flatten())
-                locations.append((x, y))
+                spectrum = _to_array(array_list, shape, dtype)
+                if spectra is None:
+                    # float32 halves the memory traffic of PCA/KMeans, which keep float32 input as-is
+                    spectra = _allocate_spectra(grid_size_x * grid_size_y, spectrum.size, np.float32)
+                spectra[x * grid_size_y + y] = spectrum.ravel()
+        
+        # (x, y) of every row, in the same x-major order as the loop above
+        locations = np.indices((grid_size_x, grid_size_y), dtype=np.int32).reshape(2, -1).T
         
         # Store in global data
-        _current_data["spectra"] = np.array(spectra)
+        _current_data["spectra"] = spectra
         _current_data["locations"] = locations
+        _current_data["meta"] = {
+            "n_spectra": spectra.shape[0],
+            "spectrum_len": spectra.shape[1],
+            "grid": (grid_size_x, grid_size_y)
+        }
         
         # Save grid collection visualization
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filepath = os.path.join(OUTPUT_DIR, f"grid_collection_{grid_size_x}x{grid_size_y}_{timestamp}.png")
         
         # Create a visualization showing sample spectra
-        fig, axes = plt.subplots(2, 2, figsize=(12, 10))
+        fig = Figure(figsize=(12, 10))
+        FigureCanvasAgg(fig)
+        axes = fig.subplots(2, 2)
         fig.suptitle(f'Grid Collection: {grid_size_x}x{grid_size_y} points', fontsize=14)
         
         # Plot 4 sample spectra from different positions
@@ -303,9 +484,8 @@ def collect_grid_spectra(
             ax.set_ylabel('Intensity')
             ax.grid(True, alpha=0.3)
         
-        plt.tight_layout()
-        plt.savefig(filepath, dpi=150, bbox_inches='tight')
-        plt.close()
+        fig.tight_layout()
+        fig.savefig(filepath, dpi=150, bbox_inches='tight')
         
         _save_image_info(filepath, f"Grid collection {grid_size_x}x{grid_size_y} sample spectra")
         
@@ -330,11 +510,20 @@ def perform_pca_analysis(n_components: int = 2) -> str:
         if len(_current_data["spectra"]) == 0:
             return "No spectra data available. Please collect spectra first using Collect_Grid_Spectra."
         
-        pca = PCA(n_components=n_components)
-        data_pca = pca.fit_transform(_current_data["spectra"])
+        from sklearn.decomposition import PCA
         
-        # Store PCA results
-        _current_data["pca_results"] = data_pca
+        pca = _current_data["pca_model"]
+        if pca is not None and pca.n_components == n_components:
+            # Same spectra and components as the last fit: reuse it instead of refitting
+            data_pca = _current_data["pca_results"]
+        else:
+            # Randomized SVD only computes the requested components instead of the full decomposition
+            pca = PCA(n_components=n_components, svd_solver="randomized", random_state=0)
+            data_pca = pca.fit_transform(_current_data["spectra"])
+            
+            # Store PCA results
+            _current_data["pca_model"] = pca
+            _current_data["pca_results"] = data_pca
         
         explained_variance = pca.explained_variance_ratio_
         
@@ -345,15 +534,16 @@ def perform_pca_analysis(n_components: int = 2) -> str:
             # 2D scatter plot
             filepath = os.path.join(OUTPUT_DIR, f"pca_analysis_{n_components}components_{timestamp}.png")
             
-            plt.figure(figsize=(10, 8))
-            plt.scatter(data_pca[:, 0], data_pca[:, 1], alpha=0.6, s=50)
-            plt.xlabel(f'PC1 ({explained_variance[0]:.2%} variance)')
-            plt.ylabel(f'PC2 ({explained_variance[1]:.2%} variance)')
-            plt.title(f'PCA Analysis - {n_components} Components')
-            plt.grid(True, alpha=0.3)
-            plt.tight_layout()
-            plt.savefig(filepath, dpi=150, bbox_inches='tight')
-            plt.close()
+            fig = Figure(figsize=(10, 8))
+            FigureCanvasAgg(fig)
+            ax = fig.subplots()
+            ax.scatter(data_pca[:, 0], data_pca[:, 1], alpha=0.6, s=50)
+            ax.set_xlabel(f'PC1 ({explained_variance[0]:.2%} variance)')
+            ax.set_ylabel(f'PC2 ({explained_variance[1]:.2%} variance)')
+            ax.set_title(f'PCA Analysis - {n_components} Components')
+            ax.grid(True, alpha=0.3)
+            fig.tight_layout()
+            fig.savefig(filepath, dpi=150, bbox_inches='tight')
             
             _save_image_info(filepath, f"PCA scatter plot ({n_components} components)")
         else:
@@ -361,7 +551,9 @@ def perform_pca_analysis(n_components: int = 2) -> str:
             filepath = os.path.join(OUTPUT_DIR, f"pca_analysis_{n_components}components_{timestamp}.png")
             
             n_plots = min(n_components, 4)
-            fig, axes = plt.subplots(2, 2, figsize=(12, 10))
+            fig = Figure(figsize=(12, 10))
+            FigureCanvasAgg(fig)
+            axes = fig.subplots(2, 2)
             fig.suptitle(f'PCA Analysis - First {n_plots} Components', fontsize=14)
             
             for idx, ax in enumerate(axes.flat):
@@ -374,9 +566,8 @@ def perform_pca_analysis(n_components: int = 2) -> str:
                 else:
                     ax.axis('off')
             
-            plt.tight_layout()
-            plt.savefig(filepath, dpi=150, bbox_inches='tight')
-            plt.close()
+            fig.tight_layout()
+            fig.savefig(filepath, dpi=150, bbox_inches='tight')
             
             _save_image_info(filepath, f"PCA component distributions ({n_components} components)")
         
@@ -421,36 +612,46 @@ def perform_clustering(
         else:
             return "No data available. Please collect spectra first using Collect_Grid_Spectra."
         
-        # Perform clustering
-        kmeans = KMeans(n_clusters=n_clusters, random_state=random_state)
-        clusters = kmeans.fit_predict(data)
+        # Perform clustering: one k-means++ run instead of ten. Low-dimensional data (e.g. PCA scores)
+        # always gets exact Lloyd, in Numba once it is large; only wide spectra use mini-batches
+        low_dim = data.shape[1] <= LOWDIM_KMEANS_MAX_DIM
+        if low_dim and data.shape[0] >= LOWDIM_KMEANS_MIN_POINTS:
+            clusters = _lowdim_kmeans(data, n_clusters, random_state)
+        else:
+            from sklearn.cluster import KMeans, MiniBatchKMeans
+            
+            if not low_dim and data.shape[0] > MINIBATCH_KMEANS_THRESHOLD:
+                kmeans = MiniBatchKMeans(n_clusters=n_clusters, batch_size=1024, n_init=3, random_state=random_state)
+            else:
+                kmeans = KMeans(n_clusters=n_clusters, n_init=1, algorithm="elkan", random_state=random_state)
+            clusters = kmeans.fit_predict(data)
         
         # Store results
         _current_data["clusters"] = clusters
         
-        # Count samples per cluster
-        cluster_counts = {}
-        for i in range(n_clusters):
-            cluster_counts[f"Cluster {i}"] = int(np.sum(clusters == i))
+        # Count samples per cluster in a single pass over the labels
+        counts = np.bincount(clusters, minlength=n_clusters)
+        cluster_counts = {f"Cluster {i}": int(counts[i]) for i in range(n_clusters)}
         
         # Save clustering visualization
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filepath = os.path.join(OUTPUT_DIR, f"clustering_{n_clusters}clusters_{timestamp}.png")
         
-        fig = plt.figure(figsize=(14, 6))
+        fig = Figure(figsize=(14, 6))
+        FigureCanvasAgg(fig)
         
         # Left plot: Scatter plot if using PCA with 2 components
         if use_pca and data.shape[1] >= 2:
-            ax1 = plt.subplot(1, 2, 1)
+            ax1 = fig.add_subplot(1, 2, 1)
             scatter = ax1.scatter(data[:, 0], data[:, 1], c=clusters, cmap='viridis', 
                                 alpha=0.6, s=50, edgecolors='black', linewidth=0.5)
             ax1.set_xlabel('PC1')
             ax1.set_ylabel('PC2')
             ax1.set_title(f'K-means Clustering ({n_clusters} clusters)')
             ax1.grid(True, alpha=0.3)
-            plt.colorbar(scatter, ax=ax1, label='Cluster')
+            fig.colorbar(scatter, ax=ax1, label='Cluster')
         else:
-            ax1 = plt.subplot(1, 2, 1)
+            ax1 = fig.add_subplot(1, 2, 1)
             ax1.text(0.5, 0.5, 'Clustering performed\non high-dimensional data', 
                     ha='center', va='center', fontsize=12)
             ax1.set_xlim(0, 1)
@@ -458,10 +659,10 @@ def perform_clustering(
             ax1.axis('off')
         
         # Right plot: Cluster distribution bar chart
-        ax2 = plt.subplot(1, 2, 2)
+        ax2 = fig.add_subplot(1, 2, 2)
         cluster_ids = list(range(n_clusters))
         counts = [cluster_counts[f"Cluster {i}"] for i in cluster_ids]
-        bars = ax2.bar(cluster_ids, counts, color=plt.cm.viridis(np.linspace(0, 1, n_clusters)))
+        bars = ax2.bar(cluster_ids, counts, color=matplotlib.colormaps['viridis'](np.linspace(0, 1, n_clusters)))
         ax2.set_xlabel('Cluster ID')
         ax2.set_ylabel('Number of Points')
         ax2.set_title('Cluster Distribution')
@@ -474,9 +675,8 @@ def perform_clustering(
             ax2.text(bar.get_x() + bar.get_width()/2., height,
                     f'{count}', ha='center', va='bottom')
         
-        plt.tight_layout()
-        plt.savefig(filepath, dpi=150, bbox_inches='tight')
-        plt.close()
+        fig.tight_layout()
+        fig.savefig(filepath, dpi=150, bbox_inches='tight')
         
         _save_image_info(filepath, f"K-means clustering ({n_clusters} clusters)")
         
@@ -485,32 +685,32 @@ def perform_clustering(
             filepath_map = os.path.join(OUTPUT_DIR, f"clustering_spatial_map_{n_clusters}clusters_{timestamp}.png")
             
             # Create spatial cluster map
-            grid_x = max([loc[0] for loc in _current_data["locations"]]) + 1
-            grid_y = max([loc[1] for loc in _current_data["locations"]]) + 1
-            cluster_map = np.zeros((grid_x, grid_y))
-            
-            for idx, (x, y) in enumerate(_current_data["locations"]):
-                cluster_map[x, y] = clusters[idx]
+            locations = _current_data["locations"]
+            grid_x, grid_y = locations.max(axis=0) + 1
+            # Built as (row=y, col=x) so imshow can take it without a transpose
+            cluster_map = np.zeros((grid_y, grid_x))
+            cluster_map[locations[:, 1], locations[:, 0]] = clusters
             
-            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
+            fig = Figure(figsize=(14, 6))
+            FigureCanvasAgg(fig)
+            ax1, ax2 = fig.subplots(1, 2)
             
             # Overview image
             im1 = ax1.imshow(_current_data["overview_image"], cmap='gray')
             ax1.set_title('Overview Image')
             ax1.set_xlabel('X')
             ax1.set_ylabel('Y')
-            plt.colorbar(im1, ax=ax1, label='Intensity')
+            fig.colorbar(im1, ax=ax1, label='Intensity')
             
             # Cluster map
-            im2 = ax2.imshow(cluster_map.T, cmap='viridis', interpolation='nearest')
+            im2 = ax2.imshow(cluster_map, cmap='viridis', interpolation='nearest')
             ax2.set_title(f'Spatial Cluster Map ({n_clusters} clusters)')
             ax2.set_xlabel('X')
             ax2.set_ylabel('Y')
-            plt.colorbar(im2, ax=ax2, label='Cluster ID')
+            fig.colorbar(im2, ax=ax2, label='Cluster ID')
             
-            plt.tight_layout()
-            plt.savefig(filepath_map, dpi=150, bbox_inches='tight')
-            plt.close()
+            fig.tight_layout()
+            fig.savefig(filepath_map, dpi=150, bbox_inches='tight')
             
             _save_image_info(filepath_map, f"Spatial cluster map ({n_clusters} clusters)")
             abs_path_map = os.path.abspath(filepath_map)
@@ -550,11 +750,12 @@ def get_analysis_summary() -> str:
         summary += "Overview Image: Not loaded\n\n"
     
     # Spectra
-    if len(_current_data["spectra"]) > 0:
+    meta = _current_data["meta"]
+    if meta is not None:
         summary += f"Spectra Data:\n"
-        summary += f"  - Number of spectra: {len(_current_data['spectra'])}\n"
-        summary += f"  - Spectrum length: {_current_data['spectra'].shape[1]}\n"
-        summary += f"  - Locations: {len(_current_data['locations'])} points\n\n"
+        summary += f"  - Number of spectra: {meta['n_spectra']}\n"
+        summary += f"  - Spectrum length: {meta['spectrum_len']}\n"
+        summary += f"  - Locations: {meta['n_spectra']} points ({meta['grid'][0]}x{meta['grid'][1]} grid)\n\n"
     else:
         summary += "Spectra Data: No spectra collected\n\n"
     
@@ -568,7 +769,7 @@ def get_analysis_summary() -> str:
     
     # Clustering
     if _current_data["clusters"] is not None:
-        n_clusters = len(np.unique(_current_data["clusters"]))
+        n_clusters = np.count_nonzero(np.bincount(_current_data["clusters"]))
         summary += f"Clustering Results:\n"
         summary += f"  - Number of clusters: {n_clusters}\n"
         summary += f"  - Samples clustered: {len(_current_data['clusters'])}\n\n"
@@ -594,19 +795,20 @@ def get_analysis_summary() -> str:
 def export_analysis_data() -> str:
     """
     Export analysis data in JSON format.
-    Returns cluster assignments and locations if available.
+    Returns cluster assignments and locations if available, as parallel
+    x / y / cluster arrays (entry i of each belongs to the same point).
     """
     try:
         export_data = {}
         
         if _current_data["clusters"] is not None and len(_current_data["locations"]) > 0:
-            export_data["cluster_map"] = [
-                {
-                    "location": {"x": loc[0], "y": loc[1]},
-                    "cluster": int(_current_data["clusters"][i])
-                }
-                for i, loc in enumerate(_current_data["locations"])
-            ]
+            locations = _current_data["locations"]
+            # orjson serializes contiguous ndarrays natively, so no per-point dicts are built
+            export_data["cluster_map"] = {
+                "x": np.ascontiguousarray(locations[:, 0]),
+                "y": np.ascontiguousarray(locations[:, 1]),
+                "cluster": np.ascontiguousarray(_current_data["clusters"], dtype=np.int32)
+            }
         
         if _current_data["pca_results"] is not None:
             export_data["pca_summary"] = {
@@ -617,7 +819,7 @@ def export_analysis_data() -> str:
         if len(export_data) == 0:
             return "No analysis data available to export."
         
-        return json.dumps(export_data, indent=2)
+        return orjson.dumps(export_data, option=orjson.OPT_SERIALIZE_NUMPY).decode()
     except Exception as e:
         return f"Error exporting data: {str(e)}"
 
@@ -629,11 +831,8 @@ def reset_analysis() -> str:
     """
     Reset all stored analysis data.
     """
-    _current_data["spectra"] = []
-    _current_data["locations"] = []
+    _release_spectra()
     _current_data["overview_image"] = None
-    _current_data["pca_results"] = None
-    _current_data["clusters"] = None
     _current_data["saved_images"] = []
     
     return "All analysis data has been reset. Ready for new analysis.\n\n(Note: Previously saved image files in the 'stem_analysis_images' folder have NOT been deleted)"